@@ -1,43 +1,156 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+import orjson
 import uuid
 import time
+import heapq
 import threading
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('api_server')
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for faster request and response handling"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+EPOCH_INTERVAL = 5  # Seconds between health monitor ticks
+HEARTBEAT_TIMEOUT_EPOCHS = 6  # Ticks without a heartbeat before a node is considered failed
+MAX_CPU_CORES = 1024  # Upper bound accepted for a node's cpu_cores
 
 class Node:
-    def __init__(self, cpu_cores, node_id=None):
+    def __init__(self, cpu_cores, node_id=None, epoch=0, container_id=None):
         self.node_id = node_id if node_id else str(uuid.uuid4())
         self.cpu_cores = cpu_cores
         self.available_cores = cpu_cores
         self.pods = []  # List to store pod IDs
-        self.status = "Ready"
-        self.last_heartbeat = time.time()
-        self.container_id = None  # Will store Docker container ID
-
-    def to_dict(self):
-        return {
+        self._status = "Ready"
+        self.last_seen_epoch = epoch  # Health monitor epoch of the last heartbeat
+        self.gen = 0  # Bumped per heartbeat so older deadline entries can be discarded
+        self.container_id = container_id  # Docker container ID
+        self.lock = threading.Lock()  # Guards status transitions
+        # Fields that rarely change; pods is shared by reference, not copied
+        self._dict_cache = {
             "node_id": self.node_id,
             "cpu_cores": self.cpu_cores,
-            "available_cores": self.available_cores,
             "pods": self.pods,
-            "status": self.status,
-            "last_heartbeat": self.last_heartbeat,
+            "status": self._status,
             "container_id": self.container_id
         }
 
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        self._status = value
+        self._dict_cache["status"] = value
+
+    def to_dict(self):
+        # last_seen_epoch is a process-local counter, not a timestamp, so it
+        # stays internal; status is the liveness signal exposed to clients
+        return {
+            **self._dict_cache,
+            "available_cores": self.available_cores
+        }
+
+class ShardedNodeMap:
+    """Node registry split into independently locked shards
+
+    Lookups and inserts only take the lock of the shard owning the node_id,
+    so concurrent heartbeats for different nodes rarely contend. Full scans
+    go shard by shard and never hold more than one shard lock.
+    """
+
+    SHARD_COUNT = 16  # Must be a power of two
+
+    def __init__(self):
+        self._shards = [{} for _ in range(self.SHARD_COUNT)]
+        self._locks = [threading.Lock() for _ in range(self.SHARD_COUNT)]
+
+    def _shard_index(self, node_id):
+        return hash(node_id) & (self.SHARD_COUNT - 1)
+
+    def get(self, node_id):
+        """Return the node with the given ID, or None"""
+        i = self._shard_index(node_id)
+        with self._locks[i]:
+            return self._shards[i].get(node_id)
+
+    def get_many(self, node_ids):
+        """Look up several nodes, taking each affected shard lock only once
+
+        Returns (found_nodes, missing_node_ids).
+        """
+        by_shard = {}
+        for node_id in node_ids:
+            by_shard.setdefault(self._shard_index(node_id), []).append(node_id)
+        found, missing = [], []
+        for i, shard_ids in by_shard.items():
+            with self._locks[i]:
+                shard = self._shards[i]
+                for node_id in shard_ids:
+                    node = shard.get(node_id)
+                    if node is None:
+                        missing.append(node_id)
+                    else:
+                        found.append(node)
+        return found, missing
+
+    def __setitem__(self, node_id, node):
+        i = self._shard_index(node_id)
+        with self._locks[i]:
+            self._shards[i][node_id] = node
+
+    def update(self, nodes):
+        """Insert several nodes, taking each affected shard lock only once"""
+        by_shard = {}
+        for node in nodes:
+            by_shard.setdefault(self._shard_index(node.node_id), []).append(node)
+        for i, shard_nodes in by_shard.items():
+            with self._locks[i]:
+                for node in shard_nodes:
+                    self._shards[i][node.node_id] = node
+
+    def __contains__(self, node_id):
+        i = self._shard_index(node_id)
+        with self._locks[i]:
+            return node_id in self._shards[i]
+
+    def iter_shards(self):
+        """Yield a snapshot of (node_id, node) pairs one shard at a time
+
+        Each shard lock is held only while its items are copied, never while
+        the caller processes them.
+        """
+        for i in range(self.SHARD_COUNT):
+            with self._locks[i]:
+                items = list(self._shards[i].items())
+            yield items
+
 class APIServer:
     """Central control unit that manages the cluster operation"""
     
     def __init__(self):
-        self.nodes = {}  # Dictionary to store nodes by node_id
+        self.nodes = ShardedNodeMap()  # Nodes by node_id, sharded for concurrent access
         self.pods = {}   # Dictionary to store pods by pod_id
-        self.heartbeat_timeout = 30  # Seconds before a node is considered failed
+        self._epoch_val = 0  # Bumped once per health monitor tick
+        self._deadlines = []  # Min-heap of (deadline_epoch, node_id, gen)
+        # Guards _deadlines; the monitor waits on it while there is nothing to watch
+        self._deadlines_cv = threading.Condition()
+        self._snapshot = ()  # Immutable tuple of node dicts served by list_nodes
+        self._publish_lock = threading.Lock()
         
         # Start health monitoring thread
         self.health_monitor_thread = threading.Thread(target=self._monitor_node_health)
@@ -48,49 +161,144 @@ class APIServer:
     
     def register_node(self, cpu_cores, container_id=None):
         """Register a new node with the cluster"""
-        new_node = Node(cpu_cores)
-        new_node.container_id = container_id
+        new_node = Node(cpu_cores, epoch=self._epoch_val, container_id=container_id)
         self.nodes[new_node.node_id] = new_node
-        logger.info(f"Registered new node with ID: {new_node.node_id}, CPU Cores: {cpu_cores}")
+        self._push_deadline(new_node, new_node.last_seen_epoch)
+        self._publish_snapshot()
+        logger.info("Registered new node with ID: %s, CPU Cores: %s", new_node.node_id, cpu_cores)
         return new_node
     
+    def register_nodes(self, specs):
+        """Register several nodes at once from (cpu_cores, container_id) pairs"""
+        epoch = self._epoch_val
+        new_nodes = [Node(cpu_cores, epoch=epoch, container_id=container_id)
+                     for cpu_cores, container_id in specs]
+        self.nodes.update(new_nodes)
+        self._push_deadlines(new_nodes, epoch)
+        self._publish_snapshot()
+        logger.info("Registered %s new nodes in bulk", len(new_nodes))
+        return new_nodes
+    
     def get_node(self, node_id):
         """Get a node by ID"""
         return self.nodes.get(node_id)
     
     def list_nodes(self):
-        """Return list of all nodes and their details"""
-        return [node.to_dict() for node in self.nodes.values()]
+        """Return all nodes and their details from the published snapshot
+
+        The snapshot is replaced, never mutated, so readers need no lock.
+        """
+        return self._snapshot
+    
+    def _publish_snapshot(self):
+        """Rebuild the list_nodes snapshot and swap it in"""
+        with self._publish_lock:
+            # Copy one shard at a time rather than locking and copying every shard at once
+            self._snapshot = tuple(
+                node.to_dict()
+                for shard_items in self.nodes.iter_shards()
+                for _, node in shard_items
+            )
     
     def update_node_heartbeat(self, node_id):
-        """Update the last heartbeat time for a node"""
-        if node_id in self.nodes:
-            self.nodes[node_id].last_heartbeat = time.time()
-            return True
-        return False
+        """Record that a node was seen in the current epoch"""
+        node = self.nodes.get(node_id)
+        if node is None:
+            return False
+        # A single int store is atomic under the GIL, so no node lock is needed
+        epoch = self._epoch_val
+        node.last_seen_epoch = epoch
+        self._push_deadline(node, epoch)
+        return True
     
-    def _monitor_node_health(self):
-        """Background thread to monitor node health based on heartbeats"""
-        while True:
-            current_time = time.time()
-            for node_id, node in list(self.nodes.items()):
-                # If node hasn't sent heartbeat within timeout period
-                if current_time - node.last_heartbeat > self.heartbeat_timeout:
+    def update_node_heartbeats(self, node_ids):
+        """Record heartbeats for several nodes, returning the IDs not found"""
+        nodes, missing = self.nodes.get_many(node_ids)
+        epoch = self._epoch_val
+        for node in nodes:
+            node.last_seen_epoch = epoch
+        self._push_deadlines(nodes, epoch)
+        return missing
+    
+    def _push_deadline(self, node, seen_epoch):
+        """Schedule a health check for when the node's latest heartbeat expires"""
+        self._push_deadlines([node], seen_epoch)
+    
+    def _push_deadlines(self, nodes, seen_epoch):
+        """Schedule health checks for nodes all seen in the same epoch"""
+        if not nodes:
+            return
+        deadline = seen_epoch + HEARTBEAT_TIMEOUT_EPOCHS + 1
+        with self._deadlines_cv:
+            head = self._deadlines[0] if self._deadlines else None
+            for node in nodes:
+                node.gen += 1
+                heapq.heappush(self._deadlines, (deadline, node.node_id, node.gen))
+            # Only wake the monitor if the soonest deadline changed
+            if self._deadlines[0] is not head:
+                self._deadlines_cv.notify()
+    
+    def _expire_nodes(self, current_epoch):
+        """Transition nodes whose heartbeat deadline has passed
+
+        Entries superseded by a newer heartbeat (stale gen) are dropped as
+        they are popped, so each tick only touches nodes that are expiring.
+        Returns True if any node's status changed.
+        """
+        changed = False
+        with self._deadlines_cv:
+            while self._deadlines and self._deadlines[0][0] <= current_epoch:
+                _, node_id, gen = heapq.heappop(self._deadlines)
+                node = self.nodes.get(node_id)
+                if node is None or node.gen != gen:
+                    continue
+                with node.lock:
                     if node.status == "Ready":
-                        logger.warning(f"Node {node_id} not responding, marking as NotReady")
+                        logger.warning("Node %s not responding, marking as NotReady", node_id)
                         node.status = "NotReady"
+                        changed = True
+                        # Fail the node on the next tick unless it heartbeats first
+                        heapq.heappush(self._deadlines, (current_epoch + 1, node_id, gen))
                     elif node.status == "NotReady":
                         # After additional timeout, mark as Failed
                         # In future weeks, we'll implement pod rescheduling here
-                        logger.error(f"Node {node_id} failed")
+                        logger.error("Node %s failed", node_id)
                         node.status = "Failed"
+                        changed = True
+        return changed
+    
+    def _monitor_node_health(self):
+        """Background thread to monitor node health based on heartbeats"""
+        while True:
+            with self._deadlines_cv:
+                # Stay idle until a registration or heartbeat gives us a deadline
+                while not self._deadlines:
+                    self._deadlines_cv.wait()
             
-            # Check every 5 seconds
-            time.sleep(5)
+            time.sleep(EPOCH_INTERVAL)
+            self._epoch_val += 1
+            # Heartbeats don't affect the snapshot, so only status changes republish it
+            if self._expire_nodes(self._epoch_val):
+                self._publish_snapshot()
 
 # Create instance of the API Server
 api_server = APIServer()
 
+def _parse_cpu_cores(value):
+    """Validate a cpu_cores value, returning (cpu_cores, error_message)"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        cpu_cores = value
+    # isdecimal, unlike isdigit, only accepts characters int() can parse
+    elif isinstance(value, str) and value.isdecimal():
+        cpu_cores = int(value)
+    else:
+        return None, "CPU cores must be a number"
+    if cpu_cores <= 0:
+        return None, "CPU cores must be positive"
+    if cpu_cores > MAX_CPU_CORES:
+        return None, f"CPU cores must be at most {MAX_CPU_CORES}"
+    return cpu_cores, None
+
 @app.route('/nodes', methods=['POST'])
 def add_node():
     """API endpoint to add a new node to the cluster"""
@@ -99,22 +307,43 @@ def add_node():
     if not data or 'cpu_cores' not in data:
         return jsonify({"error": "CPU cores specification required"}), 400
     
-    try:
-        cpu_cores = int(data['cpu_cores'])
-        if cpu_cores <= 0:
-            return jsonify({"error": "CPU cores must be positive"}), 400
-            
-        container_id = data.get('container_id')
-        new_node = api_server.register_node(cpu_cores, container_id)
-        
-        return jsonify({
-            "message": "Node added successfully",
-            "node_id": new_node.node_id,
-            "cpu_cores": new_node.cpu_cores
-        }), 201
-        
-    except ValueError:
-        return jsonify({"error": "CPU cores must be a number"}), 400
+    cpu_cores, error = _parse_cpu_cores(data['cpu_cores'])
+    if error:
+        return jsonify({"error": error}), 400
+    
+    container_id = data.get('container_id')
+    new_node = api_server.register_node(cpu_cores, container_id)
+    
+    return jsonify({
+        "message": "Node added successfully",
+        "node_id": new_node.node_id,
+        "cpu_cores": new_node.cpu_cores
+    }), 201
+
+@app.route('/nodes/bulk', methods=['POST'])
+def add_nodes():
+    """API endpoint to add several nodes to the cluster in one request"""
+    data = request.json
+    
+    if not data or not isinstance(data, list):
+        return jsonify({"error": "A list of node specifications is required"}), 400
+    
+    specs = []
+    for index, spec in enumerate(data):
+        if not isinstance(spec, dict) or 'cpu_cores' not in spec:
+            return jsonify({"error": f"Node {index}: CPU cores specification required"}), 400
+        cpu_cores, error = _parse_cpu_cores(spec['cpu_cores'])
+        if error:
+            return jsonify({"error": f"Node {index}: {error}"}), 400
+        specs.append((cpu_cores, spec.get('container_id')))
+    
+    new_nodes = api_server.register_nodes(specs)
+    
+    return jsonify({
+        "message": "Nodes added successfully",
+        "node_ids": [node.node_id for node in new_nodes],
+        "count": len(new_nodes)
+    }), 201
 
 @app.route('/nodes', methods=['GET'])
 def list_nodes():
@@ -131,10 +360,31 @@ def update_heartbeat(node_id):
     else:
         return jsonify({"error": "Node not found"}), 404
 
+@app.route('/nodes/heartbeats', methods=['POST'])
+def update_heartbeats():
+    """API endpoint for sending heartbeats for several nodes at once"""
+    data = request.json
+    
+    if not isinstance(data, dict) or not isinstance(data.get('ids'), list):
+        return jsonify({"error": "A list of node IDs is required"}), 400
+    
+    node_ids = data['ids']
+    if not all(isinstance(node_id, str) for node_id in node_ids):
+        return jsonify({"error": "Node IDs must be strings"}), 400
+    
+    unknown = api_server.update_node_heartbeats(node_ids)
+    return jsonify({
+        "status": "Heartbeats received",
+        "updated": len(node_ids) - len(unknown),
+        "unknown": unknown
+    }), 200
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Basic health check endpoint for the API server itself"""
     return jsonify({"status": "healthy"}), 200
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Development server only; deployments serve wsgi:app with gunicorn.
+    # Set FLASK_DEV=1 to enable the debugger and reloader.
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEV') == '1', threaded=True)
\ No newline at end of file
@@ -1,43 +1,107 @@
 import argparse
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import sys
 import json
 import os
-import pickle
+import time
+import threading
+import atexit
+import signal
+import msgpack
+from dataclasses import asdict
 from tabulate import tabulate
 
 API_SERVER_URL = os.environ.get("API_SERVER_URL", "http://localhost:5000")
-NODE_REGISTRY_FILE = "node_registry.pkl"
+NODE_REGISTRY_FILE = "node_registry.msgpack"
+MAX_CPU_CORES = 1024  # Same limit the API server enforces
+SAVE_DEBOUNCE_SECONDS = 0.2  # Window in which registry changes are coalesced into one write
+
+# Shared HTTP session so API calls reuse pooled keep-alive connections
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.headers["Connection"] = "keep-alive"
+
+# How each node status is shown by list-nodes; anything else is a failure
+STATUS_DISPLAY = {"Ready": "✅ Ready", "NotReady": "⚠️ NotReady"}
+FAILED_STATUS_DISPLAY = "❌ Failed"
 
 # Dictionary to keep track of running nodes
 active_nodes = {}
 
+# Set while active_nodes has changes that are not yet written to disk
+_dirty = threading.Event()
+_save_lock = threading.Lock()
+_flusher = None
+
 # Load existing nodes from file if it exists
 def load_nodes():
     global active_nodes
     try:
         if os.path.exists(NODE_REGISTRY_FILE):
+            from node_container import NodeContainer, NodeState
+            
             with open(NODE_REGISTRY_FILE, 'rb') as f:
-                active_nodes = pickle.load(f)
+                records = msgpack.unpackb(f.read(), raw=False)
+            
+            active_nodes = {}
+            for record in records:
+                state = NodeState(**record)
+                node = NodeContainer.from_state(state)
+                # Resuming heartbeats is our decision, not part of loading
+                if state.running:
+                    node._start_heartbeats()
+                active_nodes[node.node_id] = node
             print(f"Loaded {len(active_nodes)} existing nodes from registry")
     except Exception as e:
         print(f"Warning: Could not load node registry: {e}")
 
-# Save nodes to file
-def save_nodes():
+# Write nodes to file
+def _write_nodes():
     try:
+        records = [asdict(node.to_state()) for node in list(active_nodes.values())]
         with open(NODE_REGISTRY_FILE, 'wb') as f:
-            pickle.dump(active_nodes, f)
+            f.write(msgpack.packb(records, use_bin_type=True))
     except Exception as e:
         print(f"Warning: Could not save node registry: {e}")
 
+# Schedule a save; changes landing within the debounce window share one write
+def save_nodes():
+    global _flusher
+    _dirty.set()
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop)
+        _flusher.daemon = True
+        _flusher.start()
+
+def _flush_loop():
+    while True:
+        _dirty.wait()
+        time.sleep(SAVE_DEBOUNCE_SECONDS)
+        flush_now()
+
+# Write any pending changes synchronously
+def flush_now():
+    with _save_lock:
+        if _dirty.is_set():
+            _dirty.clear()
+            _write_nodes()
+
 def add_node(args):
     """Add a new node to the cluster"""
+    if not args.cpu_cores.isdecimal():
+        print("Error: CPU cores must be a number")
+        return 1
+    
     try:
         cpu_cores = int(args.cpu_cores)
         if cpu_cores <= 0:
             print("Error: CPU cores must be a positive number")
             return 1
+        if cpu_cores > MAX_CPU_CORES:
+            print(f"Error: CPU cores must be at most {MAX_CPU_CORES}")
+            return 1
         
         # This will call out to the node_container.py script to create a container
         from node_container import NodeContainer
@@ -58,9 +122,43 @@ def add_node(args):
             print("❌ Failed to add node")
             return 1
             
-    except ValueError:
-        print("Error: CPU cores must be a number")
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return 1
+
+def add_nodes(args):
+    """Add several nodes to the cluster with one bulk registration"""
+    if not (args.count.isdecimal() and args.cpu_cores.isdecimal()):
+        print("Error: Node count and CPU cores must be numbers")
         return 1
+    
+    try:
+        count = int(args.count)
+        cpu_cores = int(args.cpu_cores)
+        if count <= 0 or cpu_cores <= 0:
+            print("Error: Node count and CPU cores must be positive numbers")
+            return 1
+        if cpu_cores > MAX_CPU_CORES:
+            print(f"Error: CPU cores must be at most {MAX_CPU_CORES}")
+            return 1
+        
+        from node_container import add_nodes as start_nodes
+        
+        nodes = start_nodes(count, cpu_cores, API_SERVER_URL)
+        
+        if nodes:
+            for node in nodes:
+                active_nodes[node.node_id] = node
+            save_nodes()
+            
+            print(f"✅ {len(nodes)} nodes added successfully")
+            for node in nodes:
+                print(f"   {node.node_id} (CPU Cores: {cpu_cores})")
+            return 0
+        else:
+            print("❌ Failed to add nodes")
+            return 1
+            
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         return 1
@@ -68,39 +166,29 @@ def add_node(args):
 def list_nodes(args):
     """List all nodes in the cluster"""
     try:
-        response = requests.get(f"{API_SERVER_URL}/nodes")
+        response = _session.get(f"{API_SERVER_URL}/nodes")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             nodes = data["nodes"]
             
             if not nodes:
                 print("No nodes found in the cluster")
                 return 0
             
-            # Prepare data for tabular display
-            table_data = []
-            for node in nodes:
-                status_display = node["status"]
-                if status_display == "Ready":
-                    status_display = "✅ Ready"
-                elif status_display == "NotReady":
-                    status_display = "⚠️ NotReady"
-                else:
-                    status_display = "❌ Failed"
-                
-                # Check if this node is in our active_nodes dict
-                is_active = node["node_id"] in active_nodes
-                active_status = "Running" if is_active else "Unknown"
-                
-                table_data.append([
+            # Rows are generated lazily as tabulate consumes them
+            table_data = (
+                [
                     node["node_id"][:8] + "...",  # Shortened ID
-                    status_display,
+                    STATUS_DISPLAY.get(node["status"], FAILED_STATUS_DISPLAY),
                     node["cpu_cores"],
                     node["available_cores"],
                     len(node["pods"]),
-                    active_status
-                ])
+                    # Nodes in our active_nodes dict are run by this CLI
+                    "Running" if node["node_id"] in active_nodes else "Unknown"
+                ]
+                for node in nodes
+            )
             
             headers = ["Node ID", "Status", "Total CPU", "Available CPU", "Pod Count", "Process Status"]
             print(tabulate(table_data, headers=headers, tablefmt="grid"))
@@ -133,9 +221,9 @@ def stop_node(args):
     else:
         # Try to look up the node in the API server
         try:
-            response = requests.get(f"{API_SERVER_URL}/nodes")
+            response = _session.get(f"{API_SERVER_URL}/nodes")
             if response.status_code == 200:
-                nodes = response.json()["nodes"]
+                nodes = orjson.loads(response.content)["nodes"]
                 for node in nodes:
                     if node["node_id"] == node_id:
                         print(f"Node found in API server but not in local registry.")
@@ -175,10 +263,31 @@ def stop_all_nodes(args):
         print(f"✅ All nodes stopped successfully")
         return 0
 
+# Stop containers this invocation launched if it is killed part-way through
+def _handle_termination(signum, frame):
+    from node_container import stop_launched_nodes
+    
+    # Ignore repeated signals so cleanup isn't interrupted part-way
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    print("Interrupted, stopping nodes started by this command...")
+    for node in stop_launched_nodes():
+        active_nodes.pop(node.node_id, None)
+    save_nodes()
+    # SystemExit also unwinds any add_nodes call in progress, which stops
+    # containers its worker threads launch after this point
+    sys.exit(128 + signum)
+
 def main():
     # Load existing nodes when the program starts
     load_nodes()
     
+    # Don't lose a save still waiting in the debounce window, however we exit
+    atexit.register(flush_now)
+    signal.signal(signal.SIGTERM, _handle_termination)
+    signal.signal(signal.SIGINT, _handle_termination)
+    
     parser = argparse.ArgumentParser(description="Kubernetes-like Cluster Simulation CLI")
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
     
@@ -186,6 +295,11 @@ def main():
     add_node_parser = subparsers.add_parser("add-node", help="Add a new node to the cluster")
     add_node_parser.add_argument("cpu_cores", help="Number of CPU cores for the node")
     
+    # Add several nodes command
+    add_nodes_parser = subparsers.add_parser("add-nodes", help="Add several nodes to the cluster at once")
+    add_nodes_parser.add_argument("count", help="Number of nodes to add")
+    add_nodes_parser.add_argument("cpu_cores", help="Number of CPU cores for each node")
+    
     # List nodes command
     list_nodes_parser = subparsers.add_parser("list-nodes", help="List all nodes in the cluster")
     
@@ -201,6 +315,8 @@ def main():
     
     if args.command == "add-node":
         return add_node(args)
+    elif args.command == "add-nodes":
+        return add_nodes(args)
     elif args.command == "list-nodes":
         return list_nodes(args)
     elif args.command == "stop-node":
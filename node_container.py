@@ -1,17 +1,55 @@
 import docker
 import logging
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import os
 import signal
 import threading
 import sys
-import pickle
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('node_container')
 
+# Shared HTTP session so API calls reuse pooled keep-alive connections
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.headers["Connection"] = "keep-alive"
+
+HEARTBEAT_INTERVAL = 10  # Seconds between heartbeat rounds
+HEARTBEAT_REQUEST_TIMEOUT = 5  # Seconds before giving up on one batch so the next round isn't delayed
+
+# Running nodes whose heartbeats are sent by the shared scheduler thread.
+# Reentrant because the CLI's signal handler stops nodes on the main thread.
+_heartbeat_nodes = {}
+_heartbeat_lock = threading.RLock()
+_heartbeat_scheduler = None
+
+# Docker client shared by every NodeContainer in the process. Reentrant for
+# the same reason, since stopping a node may need the client.
+_shared_docker_client = None
+_docker_lock = threading.RLock()
+
+# Nodes whose containers were launched by this process and not yet cleaned up.
+# Reentrant so a signal handler on the main thread can take it safely.
+_launched_nodes = set()
+_launched_lock = threading.RLock()
+
+@dataclass
+class NodeState:
+    """Plain-data form of a NodeContainer, used for the on-disk registry"""
+    node_id: str
+    cpu_cores: int
+    container_id: str
+    api_server_url: str
+    running: bool
+
+
 class NodeContainer:
     """Class to simulate a node in the cluster using Docker containers"""
     
@@ -19,136 +57,116 @@ class NodeContainer:
         self.cpu_cores = cpu_cores
         self.api_server_url = api_server_url
         self.node_id = None
-        self.docker_client = None  # Will be initialized on demand
         self.container_id = None
-        self.heartbeat_thread = None
         self.running = False
     
+    def to_state(self):
+        """Capture the node's persistent fields as a NodeState"""
+        return NodeState(
+            node_id=self.node_id,
+            cpu_cores=self.cpu_cores,
+            container_id=self.container_id,
+            api_server_url=self.api_server_url,
+            running=self.running
+        )
+    
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a node from a NodeState without starting heartbeats"""
+        node = cls(state.cpu_cores, state.api_server_url)
+        node.node_id = state.node_id
+        node.container_id = state.container_id
+        return node
+    
     def _get_docker_client(self):
-        """Get or create a Docker client with appropriate configuration for the platform"""
-        if self.docker_client is None:
+        """Get the process-wide Docker client, creating it on first use"""
+        return _get_shared_docker_client()
+    
+    def _launch_container(self):
+        """Launch the Docker container backing this node, or simulate one"""
+        docker_client = self._get_docker_client()
+        
+        # Check if this is a simulated client
+        is_simulated = isinstance(docker_client, SimulatedDockerClient)
+        
+        if not is_simulated:
+            # Launch Docker container for the node
             try:
-                # Try different Docker connection options based on the platform
-                if os.name == 'nt':  # Windows
-                    self.docker_client = docker.DockerClient(base_url='npipe:////./pipe/docker_engine')
-                else:  # Linux/Mac
-                    self.docker_client = docker.from_env()
+                container = docker_client.containers.run(
+                    "python:3.9-slim",  # Using a minimal Python image
+                    command="tail -f /dev/null",  # Keep container running
+                    detach=True,
+                    # Unique suffix so containers launched in parallel don't clash
+                    name=f"kubernetes_sim_node_{uuid.uuid4().hex[:12]}",
+                    labels={"app": "kubernetes_sim", "type": "node"}
+                )
+                self.container_id = container.id
+                logger.info("Started container: %s", self.container_id)
             except Exception as e:
-                logger.error(f"Failed to initialize Docker client: {e}")
+                logger.error("Error launching container: %s", e)
                 # Fall back to simulated mode
-                self.docker_client = SimulatedDockerClient()
-                logger.warning("Using simulated Docker client due to connection error")
+                is_simulated = True
+        
+        if is_simulated:
+            # Create a simulated container ID
+            self.container_id = f"simulated_{uuid.uuid4().hex[:12]}"
+            logger.warning("Using simulated container with ID: %s", self.container_id)
         
-        return self.docker_client
+        with _launched_lock:
+            _launched_nodes.add(self)
     
     def start(self):
         """Launch the container and register with API server"""
         try:
-            docker_client = self._get_docker_client()
-            
-            # Check if this is a simulated client
-            is_simulated = isinstance(docker_client, SimulatedDockerClient)
-            
-            if not is_simulated:
-                # Launch Docker container for the node
-                try:
-                    container = docker_client.containers.run(
-                        "python:3.9-slim",  # Using a minimal Python image
-                        command="tail -f /dev/null",  # Keep container running
-                        detach=True,
-                        name=f"kubernetes_sim_node_{int(time.time())}",
-                        labels={"app": "kubernetes_sim", "type": "node"}
-                    )
-                    self.container_id = container.id
-                    logger.info(f"Started container: {self.container_id}")
-                except Exception as e:
-                    logger.error(f"Error launching container: {e}")
-                    # Fall back to simulated mode
-                    is_simulated = True
-            
-            if is_simulated:
-                # Create a simulated container ID
-                self.container_id = f"simulated_{int(time.time())}"
-                logger.warning(f"Using simulated container with ID: {self.container_id}")
+            self._launch_container()
             
             # Register with API server
-            response = requests.post(
+            response = _session.post(
                 f"{self.api_server_url}/nodes",
                 json={"cpu_cores": self.cpu_cores, "container_id": self.container_id}
             )
             
             if response.status_code == 201:
-                self.node_id = response.json()["node_id"]
-                logger.info(f"Registered with API server, node ID: {self.node_id}")
-                
-                # Start heartbeat thread
-                self.running = True
-                self.heartbeat_thread = threading.Thread(target=self._send_heartbeats)
-                self.heartbeat_thread.daemon = True
-                self.heartbeat_thread.start()
+                self.node_id = orjson.loads(response.content)["node_id"]
+                logger.info("Registered with API server, node ID: %s", self.node_id)
                 
+                self._start_heartbeats()
                 return True
             else:
-                logger.error(f"Failed to register with API server: {response.text}")
+                logger.error("Failed to register with API server: %s", response.text)
                 self._cleanup_container()
                 return False
                 
         except Exception as e:
-            logger.error(f"Error starting node container: {e}")
+            logger.error("Error starting node container: %s", e)
             self._cleanup_container()
             return False
     
     def _cleanup_container(self):
         """Clean up the container if needed"""
+        with _launched_lock:
+            _launched_nodes.discard(self)
         if self.container_id and not isinstance(self._get_docker_client(), SimulatedDockerClient):
             try:
                 container = self._get_docker_client().containers.get(self.container_id)
                 container.stop()
                 container.remove()
-                logger.info(f"Cleaned up container {self.container_id}")
+                logger.info("Cleaned up container %s", self.container_id)
             except Exception as e:
-                logger.error(f"Error cleaning up container: {e}")
+                logger.error("Error cleaning up container: %s", e)
     
-    def _send_heartbeats(self):
-        """Send periodic heartbeats to the API server"""
-        while self.running:
-            try:
-                response = requests.post(f"{self.api_server_url}/nodes/{self.node_id}/heartbeat")
-                if response.status_code == 200:
-                    logger.debug(f"Heartbeat sent for node {self.node_id}")
-                else:
-                    logger.warning(f"Failed to send heartbeat: {response.text}")
-            except Exception as e:
-                logger.error(f"Error sending heartbeat: {e}")
-            
-            # Sleep for 10 seconds before next heartbeat
-            time.sleep(10)
+    def _start_heartbeats(self):
+        """Mark the node as running and hand it to the heartbeat scheduler"""
+        self.running = True
+        _schedule_heartbeats(self)
     
     def stop(self):
         """Stop the node container"""
         self.running = False
-        if self.heartbeat_thread:
-            self.heartbeat_thread.join(1)
+        _unschedule_heartbeats(self)
         
         self._cleanup_container()
-        logger.info(f"Node {self.node_id} stopped")
-
-    def __getstate__(self):
-        """Prepare object for pickling (serialization)"""
-        state = self.__dict__.copy()
-        # Don't pickle the Docker client or thread
-        state['docker_client'] = None
-        state['heartbeat_thread'] = None
-        return state
-    
-    def __setstate__(self, state):
-        """Restore object after unpickling (deserialization)"""
-        self.__dict__.update(state)
-        # Restart the heartbeat thread if the node was running
-        if self.running:
-            self.heartbeat_thread = threading.Thread(target=self._send_heartbeats)
-            self.heartbeat_thread.daemon = True
-            self.heartbeat_thread.start()
+        logger.info("Node %s stopped", self.node_id)
 
 
 class SimulatedDockerClient:
@@ -166,7 +184,7 @@ class SimulatedDockerClient:
     
     class ContainerCollection:
         def run(self, image, **kwargs):
-            container_id = f"simulated_{int(time.time())}"
+            container_id = f"simulated_{uuid.uuid4().hex[:12]}"
             return SimulatedDockerClient.Container(container_id)
         
         def get(self, container_id):
@@ -176,6 +194,88 @@ class SimulatedDockerClient:
         self.containers = self.ContainerCollection()
 
 
+def _get_shared_docker_client():
+    """Get or create a Docker client with appropriate configuration for the platform"""
+    global _shared_docker_client
+    with _docker_lock:
+        if _shared_docker_client is None:
+            try:
+                # Try different Docker connection options based on the platform
+                if os.name == 'nt':  # Windows
+                    _shared_docker_client = docker.DockerClient(base_url='npipe:////./pipe/docker_engine')
+                else:  # Linux/Mac
+                    _shared_docker_client = docker.from_env()
+            except Exception as e:
+                logger.error("Failed to initialize Docker client: %s", e)
+                # Fall back to simulated mode
+                _shared_docker_client = SimulatedDockerClient()
+                logger.warning("Using simulated Docker client due to connection error")
+        
+        return _shared_docker_client
+
+
+def _schedule_heartbeats(node):
+    """Add a node to the shared heartbeat scheduler, starting it if needed"""
+    global _heartbeat_scheduler
+    with _heartbeat_lock:
+        _heartbeat_nodes[node.node_id] = node
+        if _heartbeat_scheduler is None:
+            _heartbeat_scheduler = threading.Thread(target=_send_heartbeats)
+            _heartbeat_scheduler.daemon = True
+            _heartbeat_scheduler.start()
+
+
+def _unschedule_heartbeats(node):
+    """Stop sending heartbeats for a node"""
+    with _heartbeat_lock:
+        _heartbeat_nodes.pop(node.node_id, None)
+
+
+def _send_heartbeats():
+    """Send one batched heartbeat per API server for all running nodes"""
+    while True:
+        node_ids_by_url = {}
+        with _heartbeat_lock:
+            for node in _heartbeat_nodes.values():
+                if node.running:
+                    node_ids_by_url.setdefault(node.api_server_url, []).append(node.node_id)
+        
+        for api_server_url, node_ids in node_ids_by_url.items():
+            try:
+                response = _session.post(
+                    f"{api_server_url}/nodes/heartbeats",
+                    json={"ids": node_ids},
+                    timeout=HEARTBEAT_REQUEST_TIMEOUT
+                )
+                if response.status_code == 200:
+                    unknown = orjson.loads(response.content)["unknown"]
+                    if unknown:
+                        logger.warning("API server does not know nodes: %s", ', '.join(unknown))
+                    logger.debug("Heartbeats sent for %s nodes", len(node_ids))
+                else:
+                    logger.warning("Failed to send heartbeats: %s", response.text)
+            except Exception as e:
+                logger.error("Error sending heartbeats: %s", e)
+        
+        time.sleep(HEARTBEAT_INTERVAL)
+
+
+def stop_launched_nodes():
+    """Stop every node whose container was launched by this process
+
+    Nodes restored from a saved registry are left running. Returns the
+    nodes that were stopped.
+    """
+    with _launched_lock:
+        nodes = list(_launched_nodes)
+    for node in nodes:
+        try:
+            node.stop()
+        except Exception as e:
+            logger.error("Error stopping node %s: %s", node.node_id, e)
+    return nodes
+
+
 def add_node(cpu_cores, api_server_url):
     """Helper function to add a new node to the cluster"""
     node = NodeContainer(cpu_cores, api_server_url)
@@ -185,6 +285,55 @@ def add_node(cpu_cores, api_server_url):
     return None
 
 
+def add_nodes(count, cpu_cores, api_server_url, max_workers=8):
+    """Helper function to add several nodes with a single bulk registration
+
+    Containers are launched concurrently, then registered with one request
+    to the API server. Returns the started nodes, or an empty list on failure.
+    """
+    nodes = [NodeContainer(cpu_cores, api_server_url) for _ in range(count)]
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        try:
+            list(executor.map(NodeContainer._launch_container, nodes))
+        finally:
+            # If interrupted, drop queued launches and wait for in-flight ones,
+            # so every container that does get launched is seen by the cleanup
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        response = _session.post(
+            f"{api_server_url}/nodes/bulk",
+            json=[{"cpu_cores": node.cpu_cores, "container_id": node.container_id} for node in nodes]
+        )
+        if response.status_code == 201:
+            node_ids = orjson.loads(response.content)["node_ids"]
+        else:
+            logger.error("Failed to bulk register with API server: %s", response.text)
+            node_ids = None
+    except Exception as e:
+        logger.error("Error starting node containers: %s", e)
+        node_ids = None
+    except BaseException:
+        # Interrupted (e.g. SystemExit from the CLI's signal handler): stop
+        # whatever this call launched that the handler didn't already stop
+        with _launched_lock:
+            leftovers = [node for node in nodes if node in _launched_nodes]
+        for node in leftovers:
+            node.stop()
+        raise
+    
+    if node_ids is None:
+        for node in nodes:
+            node._cleanup_container()
+        return []
+    
+    for node, node_id in zip(nodes, node_ids):
+        node.node_id = node_id
+        node._start_heartbeats()
+    logger.info("Registered %s nodes with API server", len(nodes))
+    return nodes
+
+
 if __name__ == "__main__":
     # Simple CLI for testing node creation
     api_url = os.environ.get("API_SERVER_URL", "http://localhost:5000")
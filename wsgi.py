@@ -0,0 +1,9 @@
+"""WSGI entry point for the API server
+
+Run with:
+    gunicorn --workers 1 --worker-class gthread --threads 16 --bind 0.0.0.0:5000 wsgi:app
+
+Node state is held in the APIServer instance of a single process, so keep
+one worker and raise --threads for concurrency.
+"""
+from api_server import app